@@ -1,6 +1,7 @@
 """Network layers and activation layers."""
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 
 from core.initializer import UniformInit
 from core.initializer import XavierUniformInit
@@ -99,21 +100,16 @@ class Conv2D(Layer):
         # calculate result feature map size
         out_h = (h - k_h) // s_h + 1
         out_w = (w - k_w) // s_w + 1
-        # allocate space for column matrix
-        col = np.zeros((batch_sz * out_h * out_w, k_h * k_w * in_c))
-        # fill in the column matrix
-        batch_span = out_w * out_h
-        for y in range(out_h):
-            y_min = y * s_h
-            y_max = y_min + k_h
-            start = y * out_w
-            for x in range(out_w):
-                x_min = x * s_w
-                x_max = x_min + k_w
-                patch = X[:, y_min:y_max, x_min:x_max, :]
-                patch = patch.reshape(batch_sz, -1)
-                col[start + x :: batch_span, :] = patch
-        return col
+        # view all the patches without copying,
+        # resulted view size: B * out_h * out_w * k_h * k_w * in_c
+        b_st, h_st, w_st, c_st = X.strides
+        patches = as_strided(
+            X, shape=(batch_sz, out_h, out_w, k_h, k_w, in_c),
+            strides=(b_st, h_st * s_h, w_st * s_w, h_st, w_st, c_st),
+            writeable=False)
+        # copy the patches into a float64 column matrix in a single pass
+        col = np.ascontiguousarray(patches, dtype=np.float64)
+        return col.reshape(batch_sz * out_h * out_w, -1)
 
     def forward(self, inputs):
         # lazy initialization
@@ -24,7 +24,10 @@ from utils.seeder import random_seed
 
 
 def get_one_hot(targets, nb_classes):
-    return np.eye(nb_classes)[np.array(targets).reshape(-1)]
+    targets = np.asarray(targets).reshape(-1)
+    one_hot = np.zeros((targets.size, nb_classes), dtype=np.float32)
+    one_hot[np.arange(targets.size), targets] = 1.0
+    return one_hot
 
 
 def prepare_dataset(data_dir):
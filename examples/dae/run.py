@@ -28,8 +28,7 @@ from utils.seeder import random_seed
 
 def save_batch_as_images(path, batch, titles=None):
     m = batch.shape[0] # batch size
-    batch_copy = batch[:]
-    batch_copy.resize(m, 28, 28)
+    batch_copy = batch.reshape(m, 28, 28)
     fig, ax = plt.subplots(int(m / 16), 16, figsize=(28,28))
     cnt = 0
     for i in range(int(m/16)):
@@ -17,7 +17,7 @@ from core.layers import Dense
 from core.layers import Flatten
 from core.layers import MaxPool2D
 from core.layers import ReLU
-from core.losses import SoftmaxCrossEntropyLoss
+from core.losses import SparseSoftmaxCrossEntropyLoss
 from core.model import Model
 from core.nn import Net
 from core.optimizer import Adam
@@ -26,14 +26,16 @@ from utils.downloader import download_url
 from utils.seeder import random_seed
 
 
-def get_one_hot(targets, nb_classes):
-    return np.eye(nb_classes)[np.array(targets).reshape(-1)]
-
-
 def prepare_dataset(data_dir):
     url = "http://deeplearning.net/data/mnist/mnist.pkl.gz"
     save_path = os.path.join(data_dir, url.split("/")[-1])
+    cache_path = os.path.join(data_dir, "mnist.npz")
     print("Preparing MNIST dataset ...")
+    # load from the cache written by a previous run if there is one
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return ((data["train_x"], data["train_y"]),
+                    (data["test_x"], data["test_y"]))
     try:
         download_url(url, save_path)
     except Exception as e:
@@ -41,19 +43,38 @@ def prepare_dataset(data_dir):
         sys.exit(1)
     # load the dataset
     with gzip.open(save_path, "rb") as f:
-        return pickle.load(f, encoding="latin1")
+        train_set, _, test_set = pickle.load(f, encoding="latin1")
+    # cache as float32 images and uint8 labels to skip unpickling next time,
+    # the validation set is not used and is left out
+    dataset = list()
+    for x, y in (train_set, test_set):
+        dataset.append((x.astype(np.float32), y.astype(np.uint8)))
+    (train_x, train_y), (test_x, test_y) = dataset
+    # write to a temporary file first so an interrupted run cannot leave
+    # a truncated cache behind
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, train_x=train_x, train_y=train_y,
+                 test_x=test_x, test_y=test_y)
+    os.replace(tmp_path, cache_path)
+    return tuple(dataset)
 
 
 def main(args):
     if args.seed >= 0:
         random_seed(args.seed)
 
-    train_set, valid_set, test_set = prepare_dataset(args.data_dir)
+    train_set, test_set = prepare_dataset(args.data_dir)
     train_x, train_y = train_set
     test_x, test_y = test_set
-    train_y = get_one_hot(train_y, 10)
+
+    # contiguous float32 images (no copy if loaded from the cache)
+    train_x = np.ascontiguousarray(train_x, dtype=np.float32)
+    test_x = np.ascontiguousarray(test_x, dtype=np.float32)
 
     if args.model_type == "cnn":
+        # Conv2D takes NHWC inputs, which keeps the channels of a pixel
+        # adjacent for im2col
         train_x = train_x.reshape((-1, 28, 28, 1))
         test_x = test_x.reshape((-1, 28, 28, 1))
 
@@ -88,7 +109,7 @@ def main(args):
     else:
         raise ValueError("Invalid argument: model_type")
 
-    model = Model(net=net, loss=SoftmaxCrossEntropyLoss(), optimizer=Adam(lr=args.lr))
+    model = Model(net=net, loss=SparseSoftmaxCrossEntropyLoss(), optimizer=Adam(lr=args.lr))
 
     iterator = BatchIterator(batch_size=args.batch_size)
     evaluator = AccEvaluator()
@@ -103,8 +124,12 @@ def main(args):
         print("Epoch %d time cost: %.4f" % (epoch, time.time() - t_start))
         # evaluate
         model.set_phase("TEST")
-        test_pred = model.forward(test_x)
-        test_pred_idx = np.argmax(test_pred, axis=1)
+        # predict in chunks to bound the memory taken by activations
+        test_pred_idx = list()
+        for start in range(0, len(test_x), args.eval_batch_size):
+            test_pred = model.forward(test_x[start: start + args.eval_batch_size])
+            test_pred_idx.append(np.argmax(test_pred, axis=1))
+        test_pred_idx = np.concatenate(test_pred_idx)
         test_y_idx = np.asarray(test_y)
         res = evaluator.evaluate(test_pred_idx, test_y_idx)
         print(res)
@@ -119,6 +144,7 @@ if __name__ == "__main__":
     parser.add_argument("--data_dir", default="./examples/mnist/data", type=str)
     parser.add_argument("--lr", default=1e-3, type=float)
     parser.add_argument("--batch_size", default=128, type=int)
+    parser.add_argument("--eval_batch_size", default=512, type=int)
     parser.add_argument("--seed", default=-1, type=int)
     args = parser.parse_args()
     main(args)
@@ -25,8 +25,7 @@ import math
 
 def save_batch_as_images(path, batch, title=None, subs=None):
     m = batch.shape[0] # batch size
-    batch_copy = batch[:]
-    batch_copy.resize(m, 28, 28)
+    batch_copy = batch.reshape(m, 28, 28)
     w = math.floor(math.sqrt(m))
     h = math.ceil(m / float(w))
     fig, ax = plt.subplots(h, w, figsize=(28, 28))
@@ -21,7 +21,7 @@ import pickle
 import numpy as np
 from matplotlib import cm as cm
 from matplotlib import pyplot as plt
-from scipy.ndimage.filters import gaussian_filter
+from scipy.ndimage import correlate1d
 
 from core.layers import Conv2D
 from core.layers import Dense
@@ -37,8 +37,7 @@ from utils.seeder import random_seed
 
 def save_batch_as_images(path, batch, title=None, subs=None):
     m = batch.shape[0] # batch size
-    batch_copy = batch[:]
-    batch_copy.resize(m, 28, 28)
+    batch_copy = batch.reshape(m, 28, 28)
     w = math.floor(math.sqrt(m))
     h = math.ceil(m / float(w))
     fig, ax = plt.subplots(h, w, figsize=(28, 28))
@@ -61,94 +60,102 @@ def save_batch_as_images(path, batch, title=None, subs=None):
     plt.close(fig)
 
 
+def gaussian_kernel_1d(sigma, truncate=4.0):
+    # same discrete kernel as scipy.ndimage.gaussian_filter uses
+    radius = int(truncate * sigma + 0.5)
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 / sigma ** 2 * x ** 2).astype(np.float32)
+    return kernel / kernel.sum()
+
+
+def gaussian_blur(img, kernel):
+    # separable blur over the (height, width) axes of a NHWC batch
+    img = correlate1d(img, kernel, axis=1)
+    return correlate1d(img, kernel, axis=2)
+
+
 def disp_mnist_batch(batch, fig=None):
-    batch = batch[:]
-    batch.resize(28, 28)
+    batch = batch.reshape(28, 28)
     if fig is None:
         fig = plt.figure()
         fig.show()
     ax = fig.gca()
+    # drop the previous image so artists do not pile up on the axes
+    ax.clear()
     ax.imshow(batch, cmap='gray', interpolation='nearest', vmin=0, vmax=1)
     fig.canvas.draw()
     return fig
 
 
 def activation_maximazation(model, init_grads, layer_idx, fig):
-    # create a random image according to MNIST statistics
+    # number of images to generate, one for each target cell(s) set
+    n = init_grads.shape[0]
+    # create random images according to MNIST statistics
     img_mean = 0.456
     img_std = 0.224
-    img = np.random.normal(img_mean, img_std, (1, 28, 28, 1))
-    disp_mnist_batch(img, fig)
+    img = np.random.normal(img_mean, img_std, (n, 28, 28, 1))
+    img = img.astype(np.float32)
+    disp_mnist_batch(img[0], fig)
     # create optimizer
     opt = Adam(lr=1e-2)
+    # pre-allocate the moments so the steps stay in float32 like the image
+    opt._m = np.zeros_like(img)
+    opt._v = np.zeros_like(img)
     sigma = 0.30
+    blur_kernel = gaussian_kernel_1d(sigma)
+    # sub-network ending at the interested layer
+    sub_net = Net(model.net.layers[0:layer_idx+1])
+    # mask of the target cells, only used for logging the loss
+    cells_idx = init_grads < 0
 
     for iteration in range(500 + 1):
         # forward pass until interested layer
-        outputs = img
-        for layer in model.net.layers[0:layer_idx+1]:
-            outputs = layer.forward(outputs)
+        outputs = sub_net.forward(img)
         # backward from interested layer
-        grads = init_grads
-        for layer in model.net.layers[0:layer_idx+1][::-1]:
-            grads = layer.backward(grads)
-        # flatten the gradients and apply steps
-        flat_grads = np.ravel(grads)
-        flat_steps = opt._compute_step(flat_grads)
-        steps = flat_steps.reshape(img.shape)
-        img += steps
+        _, grads = sub_net.backward(init_grads)
+        # apply steps (Adam is element-wise, so no need to flatten)
+        img += opt._compute_step(grads)
         # blur image to regularize this progress
-        img = gaussian_filter(img, sigma, order=0)
-        # ensure image is still in [0, 1] range
-        mean, max_, min_ = img.mean(), img.max(), img.min()
-        img = (img - min_) / (max_ - min_)
+        img = gaussian_blur(img, blur_kernel)
+        # ensure every image is still in [0, 1] range
+        min_ = img.min(axis=(1, 2, 3), keepdims=True)
+        range_ = img.max(axis=(1, 2, 3), keepdims=True) - min_
+        img -= min_
+        img *= 1.0 / np.maximum(range_, 1e-12)
 
         if iteration % 100 == 0:
-            cells_idx = (- init_grads).astype(int).astype(bool)
-            loss = - outputs[cells_idx].sum()
+            loss = - outputs[cells_idx].sum() / n
             stats = img.mean(), img.std(), img.min(), img.max()
             print('Iteration#%d, loss: %.3f' % (iteration, loss), end=" ")
             print('image: u=%.3f, std=%.3f, range=(%.3f, %.3f)' % stats)
-            disp_mnist_batch(img, fig)
+            disp_mnist_batch(img[0], fig)
     return img
 
 
 def am_visualize_conv_layer(model, layer_idx, fig):
     # get size of layer-wise input gradients (or forward output size)
-    grads = np.zeros(model.net.layers[layer_idx].cache['out_img_size'])
-    grads = np.array([grads]) # adjust dimension
-    n = grads.shape[3] # number of channels
-    # collect preferred images for all feature maps
-    images = []
-    # for each feature map in this layer
+    out_img_size = model.net.layers[layer_idx].cache['out_img_size']
+    n = out_img_size[2] # number of channels
+    # one batch entry for each feature map in this layer, fixing the
+    # gradients for the cells we are interested to maximize
+    grads = np.zeros((n,) + tuple(out_img_size), dtype=np.float32)
     for idx in range(n):
-        # fix the gradients for the cells we are interested to maximize
-        fixed_grads = grads.copy()
-        fixed_grads[:,:,:, idx] = -1
-        # generate the image that maximizes the target cell(s)
-        print('AM for feature map [%d / %d]' % (idx + 1, n))
-        img = activation_maximazation(model, fixed_grads, layer_idx, fig)
-        images.append(img[0])
-    return np.array(images)
+        grads[idx, :, :, idx] = -1
+    # generate the images that maximize the target cell(s) all at once
+    print('AM for %d feature maps' % n)
+    return activation_maximazation(model, grads, layer_idx, fig)
 
 
 def am_visualize_dense_layer(model, layer_idx, fig):
     # get size of layer-wise input gradients (or forward output size)
-    grads = np.zeros(model.net.layers[layer_idx].shapes['w'][1])
-    grads = np.array([grads]) # adjust dimension
-    n = grads.shape[1] # number of cells
-    # collect preferred images for all feature maps
-    images = []
-    # for each feature map in this layer
-    for idx in range(n):
-        # fix the gradients for the cells we are interested to maximize
-        fixed_grads = grads.copy()
-        fixed_grads[:,idx] = -1
-        # generate the image that maximizes the target cell(s)
-        print('AM for cell [%d / %d]' % (idx + 1, n))
-        img = activation_maximazation(model, fixed_grads, layer_idx, fig)
-        images.append(img[0])
-    return np.array(images)
+    n = model.net.layers[layer_idx].shapes['w'][1] # number of cells
+    # one batch entry for each cell in this layer, fixing the gradient
+    # for the cell we are interested to maximize
+    grads = np.zeros((n, n), dtype=np.float32)
+    grads[np.arange(n), np.arange(n)] = -1
+    # generate the images that maximize the target cells all at once
+    print('AM for %d cells' % n)
+    return activation_maximazation(model, grads, layer_idx, fig)
 
 
 def main(args):
@@ -184,7 +191,7 @@ def main(args):
     model.load(args.model_path)
 
     # create pyplot window for on-the-fly visualization
-    img = np.ones((1, 28, 28, 1))
+    img = np.ones((1, 28, 28, 1), dtype=np.float32)
     fig = disp_mnist_batch(img)
 
     # actual visualization generations
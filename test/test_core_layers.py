@@ -0,0 +1,56 @@
+"""test unit for core/layers.py"""
+
+import runtime_path  # isort:skip
+
+import numpy as np
+
+from core.layers import Conv2D
+
+
+def naive_im2col(X, k_h, k_w, s_h, s_w):
+    batch_sz, h, w, in_c = X.shape
+    out_h = (h - k_h) // s_h + 1
+    out_w = (w - k_w) // s_w + 1
+    col = np.zeros((batch_sz, out_h, out_w, k_h * k_w * in_c))
+    for b in range(batch_sz):
+        for y in range(out_h):
+            for x in range(out_w):
+                patch = X[b, y*s_h:y*s_h+k_h, x*s_w:x*s_w+k_w, :]
+                col[b, y, x] = patch.ravel()
+    return col.reshape(batch_sz * out_h * out_w, -1)
+
+
+def check_im2col(X, k_h, k_w, s_h, s_w):
+    col = Conv2D._im2col(X, k_h, k_w, s_h, s_w)
+    assert col.dtype == np.float64
+    assert np.array_equal(col, naive_im2col(X, k_h, k_w, s_h, s_w))
+
+
+def test_im2col_strided():
+    X = np.random.uniform(size=(3, 11, 10, 2))
+    check_im2col(X, 3, 3, 2, 2)
+    check_im2col(X, 5, 3, 2, 3)
+
+
+def test_im2col_non_contiguous():
+    X = np.random.uniform(size=(4, 12, 14, 6))
+    check_im2col(X[::2, 1:, ::2, 1::2], 3, 2, 1, 1)
+    check_im2col(X.transpose((0, 2, 1, 3)), 3, 3, 2, 1)
+
+
+def test_im2col_pointwise():
+    X = np.random.uniform(size=(2, 7, 5, 3))
+    check_im2col(X, 1, 1, 1, 1)
+    check_im2col(X, 1, 1, 2, 2)
+
+
+def test_im2col_full_kernel():
+    X = np.random.uniform(size=(2, 6, 7, 3))
+    col = Conv2D._im2col(X, 6, 7, 1, 1)
+    assert col.shape == (2, 6 * 7 * 3)
+    check_im2col(X, 6, 7, 1, 1)
+
+
+def test_im2col_float32_inputs():
+    X = np.random.uniform(size=(2, 9, 9, 2)).astype(np.float32)
+    check_im2col(X, 3, 3, 2, 2)